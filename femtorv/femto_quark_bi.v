@@ -4,7 +4,7 @@
 //             A single VERILOG file, compact & understandable code.
 //             (200 lines of code, 400 lines counting comments)
 //
-// Instruction set: RV32I + RDCYCLES
+// Instruction set: RV32I + RDCYCLES (+ RDINSTRET and bus event counters)
 //
 // Parameters:
 //  Reset address can be defined using RESET_ADDR (default is 0).
@@ -23,6 +23,14 @@
 //    by the ticks counter. If not defined, a 32-bits counter is generated.
 //    (reducing its width may be useful for space-constrained designs).
 //
+//    NRV_PERF_COUNTERS may be defined to add a read-only instructions
+//    retired counter (instret, 0xC02) and one event counter (hpmcounter3,
+//    0xC03) counting the event selected by writing mhpmevent3 (0x323):
+//    0 none, 1 bus reads, 2 bus writes, 3 wait stall cycles,
+//    4 bus released cycles, 5 interrupts taken.
+//    NRV_PERF_COUNTER_WIDTH may be defined to reduce the number of bits
+//    used by these counters (32 if not defined).
+//
 // Bruno Levy, Matthias Koch, 2020-2021
 // Modifications: Michael Bell 2023-2026
 // SPDX-License-Identifier: BSD-3-Clause
@@ -51,6 +59,7 @@ module FemtoRV32(
    input         mem_wbusy, // asserted if memory is busy writing value
 
    input         interrupt_request,
+   input   [3:0] perf_event, // bus read, bus write, wait stall, bus released
 
    input         resetn      // set to 0 to reset the processor
 );
@@ -232,25 +241,60 @@ module FemtoRV32(
    reg  [PC_WIDTH-1:0]   mepc;    // The saved program counter.
    reg                   mstatus; // Interrupt enable
    reg                   mcause;  // Interrupt cause (and lock)
-   reg  [31:0]           cycles;  // Cycle counter
+   wire [31:0]           cycles;  // Cycle counter
 
-   always @(posedge clk) begin
-      cycles[15:0] <= cycles[15:0] + 1;
-      if (cycles[15:0] == 16'hffff) cycles[31:16] <= cycles[31:16] + 1;
-   end
+   FemtoRV32_counter cycles_counter(.clk(clk), .inc(1'b1), .count(cycles));
 
    wire sel_mstatus = (instr[31:20] == 12'h300);
    wire sel_mepc    = (instr[31:20] == 12'h341);
    wire sel_mcause  = (instr[31:20] == 12'h342);
    wire sel_cycles  = (instr[31:20] == 12'hC00);
 
+`ifdef NRV_PERF_COUNTERS
+ `ifdef NRV_PERF_COUNTER_WIDTH
+   localparam PERF_WIDTH = `NRV_PERF_COUNTER_WIDTH;
+ `else
+   localparam PERF_WIDTH = 32;
+ `endif
+
+   // Performance counters: instret and one event counter, with the
+   // event it counts selected by mhpmevent3
+   wire [PERF_WIDTH-1:0] instret;     // Instructions retired
+   wire [PERF_WIDTH-1:0] hpmcounter3; // Events selected by mhpmevent3
+   reg   [2:0]           mhpmevent3;  // 0: none, 1: bus reads, 2: bus writes,
+                                      // 3: wait stall cycles, 4: bus released cycles,
+                                      // 5: interrupts taken
+
+   wire [7:0] hpm_events = {2'b0, interrupt_accepted, perf_event, 1'b0};
+
+   FemtoRV32_counter #(.WIDTH(PERF_WIDTH)) instret_counter(
+      .clk(clk), .inc(state[EXECUTE_bit]), .count(instret));
+   FemtoRV32_counter #(.WIDTH(PERF_WIDTH)) hpm_counter3(
+      .clk(clk), .inc(hpm_events[mhpmevent3]), .count(hpmcounter3));
+
+   wire sel_instret     = (instr[31:20] == 12'hC02);
+   wire sel_hpmcounter3 = (instr[31:20] == 12'hC03);
+   wire sel_mhpmevent3  = (instr[31:20] == 12'h323);
+
+   /* verilator lint_off WIDTHEXPAND */
+   wire [31:0] perf_read =
+     (sel_instret     ? instret            : 32'b0) |
+     (sel_hpmcounter3 ? hpmcounter3        : 32'b0) |
+     (sel_mhpmevent3  ? {29'b0, mhpmevent3} : 32'b0) ;
+   /* verilator lint_on WIDTHEXPAND */
+`else
+   wire [31:0] perf_read = 32'b0;
+   wire unused_perf = &{1'b0, perf_event};
+`endif
+
    // Read CSRs:
    /* verilator lint_off WIDTHEXPAND */
    wire [31:0] CSR_read =
      (sel_mstatus ? {28'b0, mstatus, 3'b0}  : 32'b0) |
      (sel_mepc    ? mepc                    : 32'b0) |
      (sel_mcause  ? {mcause, 31'b0}         : 32'b0) |
-     (sel_cycles  ? cycles[31:0]            : 32'b0) ;
+     (sel_cycles  ? cycles[31:0]            : 32'b0) |
+     perf_read ;
    /* verilator lint_on WIDTHEXPAND */
 
    // Write CSRs: 5 bit unsigned immediate or content of RS1
@@ -265,10 +309,16 @@ module FemtoRV32(
    always @(posedge clk) begin
       if(!resetn) begin
 	      mstatus <= 0;
+`ifdef NRV_PERF_COUNTERS
+	      mhpmevent3 <= 0;
+`endif
       end else begin
          // Execute a CSR opcode
          if (isSYSTEM & (instr[14:12] != 0) & state[EXECUTE_bit]) begin
             if (sel_mstatus) mstatus <= CSR_write[3];
+`ifdef NRV_PERF_COUNTERS
+            if (sel_mhpmevent3) mhpmevent3 <= CSR_write[2:0];
+`endif
          end
       end
    end
@@ -471,13 +521,43 @@ module FemtoRV32(
 
     integer i;
     initial begin
-        cycles = 0;
         for (i = 0; i < 32; i = i + 1)
             registerFile[i] = 0;
     end
 
 endmodule
 
+/*******************************************************************/
+// Event counter. Counters wider than 16 bits are counted as two halves
+// to keep the carry chain short.
+
+module FemtoRV32_counter #(
+   parameter WIDTH = 32
+) (
+   input                  clk,
+   input                  inc,   // count this cycle
+   output reg [WIDTH-1:0] count
+);
+
+   generate
+      if (WIDTH > 16) begin : split
+         always @(posedge clk) begin
+            if (inc) begin
+               count[15:0] <= count[15:0] + 1;
+               if (count[15:0] == 16'hffff) count[WIDTH-1:16] <= count[WIDTH-1:16] + 1;
+            end
+         end
+      end else begin : single
+         always @(posedge clk) begin
+            if (inc) count <= count + 1;
+         end
+      end
+   endgenerate
+
+   initial count = 0;
+
+endmodule
+
 /*****************************************************************************/
 // Notes:
 //
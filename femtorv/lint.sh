@@ -1,3 +1,4 @@
 #!/bin/bash
 
-verilator --lint-only -DSIM --timing -Wall -Wno-DECLFILENAME -Wno-MULTITOP rv4028.v femto_quark_bi.v rom.v
\ No newline at end of file
+verilator --lint-only -DSIM --timing -Wall -Wno-DECLFILENAME -Wno-MULTITOP rv4028.v femto_quark_bi.v rom.v
+verilator --lint-only -DSIM -DNRV_PERF_COUNTERS -DRV4028_POSTED_WRITES -DRV4028_WIDE_ROM --timing -Wall -Wno-DECLFILENAME -Wno-MULTITOP rv4028.v femto_quark_bi.v rom.v
\ No newline at end of file
@@ -8,9 +8,15 @@
 module rv4028_rom(
     input clk,
     input ren,
+`ifdef RV4028_WIDE_ROM
+    input [12:2] addr,
+
+    output reg [31:0] data_out
+`else
     input [12:1] addr,
 
     output reg [15:0] data_out
+`endif
 );
 
     parameter INIT_FILE = "rom.hex";
@@ -22,7 +28,12 @@ module rv4028_rom(
 
     always @(posedge clk) begin
         if (ren) begin
+`ifdef RV4028_WIDE_ROM
+            // Both halves of the word, still mapped onto 16-bit wide BRAMs
+            data_out <= {rom[{addr, 1'b1}], rom[{addr, 1'b0}]};
+`else
             data_out <= rom[addr];
+`endif
         end
     end
 
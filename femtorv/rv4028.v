@@ -37,6 +37,7 @@ module RV4028_femtorv(
     wire        femto_rstrb;
     wire        femto_rbusy;
     wire        femto_wbusy;
+    wire  [3:0] perf_event;
 
     FemtoRV32 i_femtorv(
         .clk(clk),
@@ -51,12 +52,11 @@ module RV4028_femtorv(
         .mem_rbusy(femto_rbusy),
         .mem_wbusy(femto_wbusy),
         .interrupt_request(!int_n),
+        .perf_event(perf_event),
         .resetn(rst_n)
     );
 
     reg [15:0] buffered_rdata;
-    wire [15:0] rom_data;
-    wire [15:0] rdata;
     reg  [1:0] read_cycle;
     reg  [1:0] write_cycle;
     wire       read_in_progress;
@@ -64,10 +64,80 @@ module RV4028_femtorv(
     wire       read_finishing;
     wire       write_finishing;
     wire       is_rom_addr;
+    wire       read_start;
+    wire       bus_read_start;
+    wire       rom_read_finishing;
+
+`ifdef RV4028_WIDE_ROM
+    // The ROM returns the whole word from internal BRAM on the cycle after the strobe
+    wire [31:0] rom_data;
+    wire [15:0] rdata = data_in;
+    wire [12:2] rom_addr = femto_addr[12:2];
+    assign femto_rdata = is_rom_addr ? rom_data : {data_in, read_cycle[1] ? buffered_rdata : data_in};
+    assign rom_read_finishing = is_rom_addr;
+`else
+    wire [15:0] rom_data;
+    wire [15:0] rdata = is_rom_addr ? rom_data : data_in;
+    wire [12:1] rom_addr = {femto_addr[12:2], femto_half ? femto_addr[1] : read_cycle[1]};
     assign femto_rdata = {rdata, read_cycle[1] ? buffered_rdata : rdata};
-    assign femto_rbusy = femto_rstrb || (read_in_progress && !read_finishing) || !busack_n;
+    assign rom_read_finishing = 1'b0;
+`endif
+
+`ifdef RV4028_POSTED_WRITES
+    // Writes are posted: the address and mask are latched on the strobe and
+    // the core continues while the write completes.  Writes to IO are not posted.
+    // The write data is still valid from the core, as the next instruction can't
+    // be latched before the last cycle of the write.
+    reg [31:1] write_addr;
+    reg  [3:0] write_mask;
+    reg        write_half;
+    reg        read_pending;
+
+    assign femto_wbusy = !iorq_n && (femto_wstrb || (write_in_progress && !write_finishing));
+
+    // Reads from the bus wait for any posted write to complete, which keeps
+    // reads and writes in order.  ROM reads don't use the bus so go ahead.
+    assign read_start = (femto_rstrb || read_pending) && (is_rom_addr || !write_in_progress);
+
+    always @(posedge clk) begin
+        if (!rst_n) begin
+            read_pending <= 0;
+        end else begin
+            read_pending <= (femto_rstrb || read_pending) && !read_start;
+        end
+    end
+
+    always @(posedge clk) begin
+        if (femto_wstrb) begin
+            write_addr <= femto_addr[31:1];
+            write_mask <= femto_mask;
+            write_half <= femto_half;
+        end
+    end
+
+    wire [31:1] bus_addr  = write_in_progress ? write_addr : femto_addr[31:1];
+    wire  [3:0] bus_mask  = write_in_progress ? write_mask : femto_mask;
+    wire        bus_half  = write_in_progress ? write_half : femto_half;
+
+    // ROM reads can overlap a posted write, so they don't assert mreq_n
+    wire        mreq_read_start = bus_read_start;
+    wire        mreq_reading    = read_in_progress && !is_rom_addr;
+`else
+    wire        read_pending = 1'b0;
+
     assign femto_wbusy = femto_wstrb || (write_in_progress && !write_finishing);
-    assign rd_n = !(femto_rstrb || read_in_progress) || is_rom_addr;
+    assign read_start = femto_rstrb;
+
+    wire [31:1] bus_addr  = femto_addr[31:1];
+    wire  [3:0] bus_mask  = femto_mask;
+    wire        bus_half  = femto_half;
+
+    wire        mreq_read_start = femto_rstrb;
+    wire        mreq_reading    = read_in_progress;
+`endif
+
+    assign femto_rbusy = femto_rstrb || read_pending || (read_in_progress && !read_finishing) || !busack_n;
+    assign rd_n = !(read_start || read_in_progress) || is_rom_addr;
     assign wr_n[0] = !(femto_wstrb || write_cycle == 2'b10);
     assign wr_n[1] = !(femto_wstrb || write_cycle == 2'b10);
 
@@ -79,21 +149,22 @@ module RV4028_femtorv(
     assign read_in_progress = |read_cycle;
     assign write_in_progress = |write_cycle;
 
-    assign read_finishing = read_cycle[0] && wait_n_r && (femto_half || read_cycle[1]);
-    assign write_finishing = write_cycle[0] && (femto_half || write_cycle[1]);
+    assign read_finishing = read_cycle[0] && (rom_read_finishing || (wait_n_r && (femto_half || read_cycle[1])));
+    assign write_finishing = write_cycle[0] && (bus_half || write_cycle[1]);
 
     assign is_rom_addr = (femto_addr[31:24] == 8'h08);
-    assign rdata = is_rom_addr ? rom_data : data_in;
+
+    assign bus_read_start = read_start && !is_rom_addr;
 
     always @(posedge clk) begin
         if (!rst_n) begin
             read_cycle <= 0;
             busack_n <= 1'b1;
         end else begin
-            if (femto_rstrb && !busrq_n)
+            if (read_start && !write_in_progress && !busrq_n)
                 busack_n <= 1'b0;
             else 
-            if (femto_rstrb || read_in_progress || (busrq_n && !busack_n)) begin
+            if (read_start || read_in_progress || (busrq_n && !busack_n)) begin
                 busack_n <= 1'b1;
                 if (!(!wait_n_r && read_cycle[0])) begin
                     read_cycle <= read_cycle + 1;
@@ -121,23 +192,25 @@ module RV4028_femtorv(
         end
     end
 
-    wire addr1 = femto_half ? femto_addr[1] : (read_cycle[1] | write_cycle[1]);
-    assign addr = {femto_addr[31:2], addr1, 1'b0};
-    assign msk_n = addr1 ? ~femto_mask[3:2] : ~femto_mask[1:0];
+    wire addr1 = bus_half ? bus_addr[1] : (read_cycle[1] | write_cycle[1]);
+    assign addr = {bus_addr[31:2], addr1, 1'b0};
+    assign msk_n = addr1 ? ~bus_mask[3:2] : ~bus_mask[1:0];
 
     assign data_out = addr1 ? femto_wdata[31:16] : femto_wdata[15:0];
     assign data_oe = write_cycle[0];
 
+    assign perf_event = {!busack_n, read_cycle[0] && !wait_n_r && !is_rom_addr, femto_wstrb, bus_read_start};
+
     assign iorq_n = !addr[31];
-    assign mreq_n[0] = !(femto_rstrb || (read_cycle == 2'b10) || 
+    assign mreq_n[0] = !(mreq_read_start || (mreq_reading && read_cycle == 2'b10) || 
                          femto_wnext || femto_wstrb || (write_in_progress && !write_finishing)) && wait_n_r;
-    assign mreq_n[1] = !(femto_rstrb || read_in_progress || 
+    assign mreq_n[1] = !(mreq_read_start || mreq_reading || 
                          femto_wstrb || (write_cycle == 2'b10));
 
     rv4028_rom i_rom(
         .clk(clk),
         .ren(1'b1),
-        .addr(addr[12:1]),
+        .addr(rom_addr),
         .data_out(rom_data)
     );
 
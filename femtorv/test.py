@@ -1,3 +1,4 @@
+import os
 import random
 
 import cocotb
@@ -12,6 +13,14 @@ from riscvmodel.regnames import x0, x1, sp, gp, tp, a0, a1, a2, a3, a4, x9, x10,
 from riscvmodel import csrnames
 from riscvmodel.variant import RV32I
 
+# Build options, set by test_basic.mk
+WIDE_ROM = os.environ.get("WIDE_ROM") == "1"
+POSTED_WRITES = os.environ.get("POSTED_WRITES") == "1"
+PERF_COUNTERS = os.environ.get("PERF_COUNTERS") == "1"
+
+# A ROM word read takes 2 cycles with the wide ROM, otherwise 4 like a bus read
+ROM_WORD_CYCLES = 2 if WIDE_ROM else 4
+
 async def reset(dut):
     dut.wait_n.value = 1
     dut.busrq_n.value = 1
@@ -24,9 +33,15 @@ async def reset(dut):
     assert dut.rd_n.value == 1
     assert dut.mreq_n.value == 1
     dut.rst_n.value = 1
+    return await cycles_until_read(dut)
+
+async def cycles_until_read(dut):
+    cycles = 0
     while dut.rd_n.value == 1:
         await ClockCycles(dut.clk, 1)
         await Timer(1, "ns")
+        cycles += 1
+    return cycles
 
 async def expect_read(dut, data, addr=None, wait_cycles=0):
     assert dut.wr_n.value == 1
@@ -512,6 +527,255 @@ async def test_interrupt(dut):
     await send_instr(dut, InstructionSW(gp, x1, 0x234).encode(), 0x1018)
     await expect_write(dut, 0x100, 0x400234)
 
+@cocotb.test()
+async def test_rom(dut):
+    dut._log.info("Start")
+    
+    clock = Clock(dut.clk, 40, unit="ns")
+    cocotb.start_soon(clock.start())
+
+    # Reset, then the ROM fetch of the jump to 0
+    boot_cycles = await reset(dut)
+    dut._log.info("Cycles from reset to first bus read: {}".format(boot_cycles))
+    assert boot_cycles == ROM_WORD_CYCLES + 1
+
+    await send_instr(dut, InstructionLUI(gp, 0x400).encode(), 0)
+    await send_instr(dut, InstructionLUI(a0, 0x8000).encode(), 4)
+
+    # Loads from ROM don't use the bus
+    await send_instr(dut, InstructionLW(a1, a0, 4).encode(), 8)
+    rom_cycles = await cycles_until_read(dut)
+    dut._log.info("ROM word load took {} cycles, bus word load takes 4".format(rom_cycles))
+    assert rom_cycles == ROM_WORD_CYCLES
+    await send_instr(dut, InstructionSW(gp, a1, 0x234).encode(), 0xC)
+    await expect_write(dut, 0xea630002, 0x400234)
+
+    await send_instr(dut, InstructionLH(a1, a0, 6).encode(), 0x10)
+    assert await cycles_until_read(dut) == 2
+    await send_instr(dut, InstructionSW(gp, a1, 0x234).encode(), 0x14)
+    await expect_write(dut, 0xffffea63, 0x400234)
+
+    await send_instr(dut, InstructionLHU(a1, a0, 4).encode(), 0x18)
+    assert await cycles_until_read(dut) == 2
+    await send_instr(dut, InstructionSW(gp, a1, 0x234).encode(), 0x1C)
+    await expect_write(dut, 0x0002, 0x400234)
+
+    await send_instr(dut, InstructionLB(a1, a0, 7).encode(), 0x20)
+    assert await cycles_until_read(dut) == 2
+    await send_instr(dut, InstructionSW(gp, a1, 0x234).encode(), 0x24)
+    await expect_write(dut, 0xffffffea, 0x400234)
+
+@cocotb.test()
+async def test_cpi(dut):
+    dut._log.info("Start")
+    
+    clock = Clock(dut.clk, 40, unit="ns")
+    cocotb.start_soon(clock.start())
+
+    # Reset
+    await reset(dut)
+
+    # ROM jumps to address 0
+    await send_instr(dut, InstructionLUI(gp, 0x400).encode(), 0)
+
+    # The next fetch is issued during execute, so the bus is never idle:
+    # each instruction costs exactly its two 16-bit bus reads.
+    start_time = get_sim_time("ns")
+    for i in range(8):
+        await send_instr(dut, InstructionADDI(i+8, x0, 0x102*i).encode(), 4 + 4*i)
+    await send_instr(dut, InstructionJAL(x0, 0x100).encode(), 0x24)
+    await send_instr(dut, InstructionBEQ(x0, x0, 0x100).encode(), 0x124)
+    cycles = round((get_sim_time("ns") - start_time) / 40)
+    dut._log.info("10 ALU/jump instructions took {} cycles".format(cycles))
+    assert cycles == 40
+
+    start_time = get_sim_time("ns")
+    await send_instr(dut, InstructionLW(x16, gp, 0x334).encode(), 0x224)
+    await expect_read(dut, 0x12345678, 0x400334)
+    await send_instr(dut, InstructionSW(gp, x16, 0x234).encode(), 0x228)
+    await expect_write(dut, 0x12345678, 0x400234)
+    cycles = round((get_sim_time("ns") - start_time) / 40)
+    dut._log.info("Load and store took {} cycles".format(cycles))
+    assert cycles == 16
+
+    await send_instr(dut, InstructionNOP().encode(), 0x22c)
+
+@cocotb.test(skip=not POSTED_WRITES)
+async def test_posted_write(dut):
+    dut._log.info("Start")
+    
+    clock = Clock(dut.clk, 40, unit="ns")
+    cocotb.start_soon(clock.start())
+
+    # Reset
+    await reset(dut)
+
+    # ROM jumps to address 0
+    await send_instr(dut, InstructionLUI(gp, 0x400).encode(), 0)
+    await send_instr(dut, InstructionLUI(tp, 0x80000).encode(), 4)
+    await send_instr(dut, InstructionADDI(a1, x0, 0x123).encode(), 8)
+    await send_instr(dut, InstructionLUI(a0, 0x8000).encode(), 0xC)
+
+    # Call the store routine in the sim ROM at 0x08000100:
+    #   sw a1, 0(gp); sw a1, 4(gp); sw a1, 0(tp); jalr x0, 0(ra)
+    await send_instr(dut, InstructionJALR(x1, a0, 0x100).encode(), 0x10)
+    await ClockCycles(dut.clk, ROM_WORD_CYCLES)
+    await Timer(1, "ns")
+    start_time = get_sim_time("ns")
+
+    # The core runs on from ROM while the RAM writes complete.  With the wide
+    # ROM the writes go back to back, otherwise each store waits 2 more
+    # cycles for its fetch.  Bus release must wait for the writes.
+    fetch_gap = ROM_WORD_CYCLES - 2
+    async def wait_fetch():
+        if fetch_gap:
+            await ClockCycles(dut.clk, fetch_gap)
+            await Timer(1, "ns")
+
+    dut.busrq_n.value = 0
+    await expect_write(dut, 0x123, 0x400000)
+    await wait_fetch()
+    await expect_write(dut, 0x123, 0x400004)
+    assert dut.busack_n.value == 1
+    await wait_fetch()
+
+    # The IO write isn't posted, so the ROM fetch of the return starts after it
+    await expect_write(dut, 0x123, 0x80000000)
+    cycles = round((get_sim_time("ns") - start_time) / 40)
+    dut._log.info("ROM stores took {} cycles, {} without posted writes".format(cycles, 12 + 2 * ROM_WORD_CYCLES))
+    assert cycles == 12 + 2 * fetch_gap
+
+    # The held bus request is granted at that fetch, the first read with no write in progress
+    assert dut.busack_n.value == 1
+    await ClockCycles(dut.clk, 1)
+    await Timer(1, "ns")
+    assert dut.busack_n.value == 0
+    await ClockCycles(dut.clk, 3)
+    assert dut.busack_n.value == 0
+    assert dut.rd_n.value == 1
+    dut.busrq_n.value = 1
+    assert await cycles_until_read(dut) == ROM_WORD_CYCLES
+    assert dut.busack_n.value == 1
+
+    # An external fetch waits for the posted write to finish
+    await send_instr(dut, InstructionSW(gp, a1, 0x234).encode(), 0x14)
+    await expect_write(dut, 0x123, 0x400234)
+    await send_instr(dut, InstructionLW(x16, gp, 0x234).encode(), 0x18)
+    await expect_read(dut, 0x123, 0x400234)
+
+    # Including when an interrupt is taken on the store
+    await send_instr(dut, InstructionADDI(x1, x0, 0x8).encode(), 0x1C)
+    await send_instr(dut, InstructionCSRRW(x0, x1, csrnames.mstatus).encode(), 0x20)
+    dut.int_n.value = 0
+    await send_instr(dut, InstructionSW(gp, a1, 0x238).encode(), 0x24)
+    await expect_write(dut, 0x123, 0x400238)
+    dut.int_n.value = 1
+    await send_instr(dut, InstructionCSRRS(a0, x0, csrnames.mepc).encode(), 0)
+    await check_reg(dut, a0, 0x28)
+
+# riscvmodel encodes the CSR number as a signed 12-bit immediate
+def csr(num):
+    return num - 0x1000 if num >= 0x800 else num
+
+HPM_BUS_READS = 1
+HPM_BUS_WRITES = 2
+HPM_WAIT_CYCLES = 3
+HPM_BUSACK_CYCLES = 4
+HPM_INTERRUPTS = 5
+
+async def select_hpm_event(dut, event):
+    await send_instr(dut, InstructionADDI(x1, x0, event).encode())
+    await send_instr(dut, InstructionCSRRW(x0, x1, csrnames.mhpmevent3).encode())
+
+@cocotb.test(skip=not PERF_COUNTERS)
+async def test_perf_counters(dut):
+    dut._log.info("Start")
+    
+    clock = Clock(dut.clk, 40, unit="ns")
+    cocotb.start_soon(clock.start())
+
+    # Reset
+    await reset(dut)
+
+    # ROM jumps to address 0
+    await send_instr(dut, InstructionLUI(gp, 0x400).encode(), 0)
+
+    await select_hpm_event(dut, HPM_BUS_READS)
+    await send_instr(dut, InstructionCSRRS(a3, x0, csrnames.mhpmevent3).encode())
+    await send_instr(dut, InstructionCSRRS(a0, x0, csr(csrnames.hpmcounter3)).encode())
+    await send_instr(dut, InstructionCSRRS(a2, x0, csr(csrnames.instret)).encode())
+    await send_instr(dut, InstructionLW(x16, gp, 0x334).encode())
+    await expect_read(dut, 0x12345678, 0x400334)
+    await send_instr(dut, InstructionSW(gp, x16, 0x334).encode())
+    await expect_write(dut, 0x12345678, 0x400334)
+    await send_instr(dut, InstructionLH(x16, gp, 0x334).encode())
+    await expect_read_hword(dut, 0x1234, 0x400334, 0, 3)
+    await send_instr(dut, InstructionCSRRS(a4, x0, csr(csrnames.hpmcounter3)).encode())
+    await send_instr(dut, InstructionCSRRS(x16, x0, csr(csrnames.instret)).encode())
+    await send_instr(dut, InstructionSUB(a4, a4, a0).encode())
+    await send_instr(dut, InstructionSUB(x16, x16, a2).encode())
+
+    # 5 instruction fetches and 2 loads
+    await check_reg(dut, a3, HPM_BUS_READS)
+    await check_reg(dut, a4, 7)
+    await check_reg(dut, x16, 5)
+
+    await select_hpm_event(dut, HPM_BUS_WRITES)
+    await send_instr(dut, InstructionCSRRS(a0, x0, csr(csrnames.hpmcounter3)).encode())
+    await send_instr(dut, InstructionSW(gp, x16, 0x334).encode())
+    await expect_write(dut, 5, 0x400334)
+    await send_instr(dut, InstructionCSRRS(a1, x0, csr(csrnames.hpmcounter3)).encode())
+    await send_instr(dut, InstructionSUB(a1, a1, a0).encode())
+    await check_reg(dut, a1, 1)
+
+    await select_hpm_event(dut, HPM_WAIT_CYCLES)
+    await send_instr(dut, InstructionCSRRS(a0, x0, csr(csrnames.hpmcounter3)).encode())
+    await send_instr(dut, InstructionLH(x16, gp, 0x334).encode())
+    await expect_read_hword(dut, 0x1234, 0x400334, 0, 3)
+    await send_instr(dut, InstructionCSRRS(a1, x0, csr(csrnames.hpmcounter3)).encode())
+    await send_instr(dut, InstructionSUB(a1, a1, a0).encode())
+    await check_reg(dut, a1, 3)
+
+    # Release the bus for 5 cycles while fetching the next instruction
+    await select_hpm_event(dut, HPM_BUSACK_CYCLES)
+    await send_instr(dut, InstructionCSRRS(a0, x0, csr(csrnames.hpmcounter3)).encode())
+    fetch_addr = dut.addr.value.to_unsigned()
+    dut.busrq_n.value = 0
+    await ClockCycles(dut.clk, 1)
+    await Timer(1, "ns")
+    assert dut.busack_n.value == 0
+    await ClockCycles(dut.clk, 4)
+    assert dut.busack_n.value == 0
+    dut.busrq_n.value = 1
+    instr = InstructionCSRRS(a1, x0, csr(csrnames.hpmcounter3)).encode()
+    dut.data_in.value = instr & 0xffff
+    await ClockCycles(dut.clk, 1)
+    await Timer(1, "ns")
+    assert dut.busack_n.value == 1
+    assert dut.rd_n.value == 0
+    assert dut.addr.value == fetch_addr
+    await ClockCycles(dut.clk, 1)
+    dut.data_in.value = instr >> 16
+    await Timer(1, "ns")
+    assert dut.addr.value == fetch_addr + 2
+    await ClockCycles(dut.clk, 2)
+    await Timer(1, "ns")
+    dut.data_in.value = LogicArray("ZZZZZZZZZZZZZZZZ")
+    await send_instr(dut, InstructionSUB(a1, a1, a0).encode())
+    await check_reg(dut, a1, 5)
+
+    # Take an interrupt
+    await select_hpm_event(dut, HPM_INTERRUPTS)
+    await send_instr(dut, InstructionCSRRS(a0, x0, csr(csrnames.hpmcounter3)).encode())
+    await send_instr(dut, InstructionADDI(x1, x0, 0x8).encode())
+    dut.int_n.value = 0
+    await send_instr(dut, InstructionCSRRW(x0, x1, csrnames.mstatus).encode())
+    await send_instr(dut, InstructionNOP().encode())
+    dut.int_n.value = 1
+    await send_instr(dut, InstructionCSRRS(a1, x0, csr(csrnames.hpmcounter3)).encode(), 0)
+    await send_instr(dut, InstructionSUB(a1, a1, a0).encode(), 4)
+    await check_reg(dut, a1, 1)
+
 ### Random operation testing ###
 reg = [0] * 32
 
@@ -0,0 +1,6 @@
+#!/bin/bash
+
+set -e
+
+make -f test_basic.mk
+make -f test_basic.mk WIDE_ROM=1 POSTED_WRITES=1 PERF_COUNTERS=1
\ No newline at end of file
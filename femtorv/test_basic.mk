@@ -8,8 +8,25 @@ TOPLEVEL_LANG ?= verilog
 SRC_DIR = $(PWD)
 PROJECT_SOURCES = rv4028.v femto_quark_bi.v rom.v
 
+# Build options, as for the hardware build:
+#   make -f test_basic.mk WIDE_ROM=1 POSTED_WRITES=1 PERF_COUNTERS=1
+# Tests of an option are skipped when it is not enabled.
+ifeq ($(WIDE_ROM),1)
+COMPILE_ARGS 		+= -DRV4028_WIDE_ROM
+BUILD_SUFFIX		:= $(BUILD_SUFFIX)_wide_rom
+endif
+ifeq ($(POSTED_WRITES),1)
+COMPILE_ARGS 		+= -DRV4028_POSTED_WRITES
+BUILD_SUFFIX		:= $(BUILD_SUFFIX)_posted_writes
+endif
+ifeq ($(PERF_COUNTERS),1)
+COMPILE_ARGS 		+= -DNRV_PERF_COUNTERS
+BUILD_SUFFIX		:= $(BUILD_SUFFIX)_perf_counters
+endif
+export WIDE_ROM POSTED_WRITES PERF_COUNTERS
+
 # RTL simulation:
-SIM_BUILD				= sim_build/rtl
+SIM_BUILD				= sim_build/rtl$(BUILD_SUFFIX)
 VERILOG_SOURCES += $(addprefix $(SRC_DIR)/,$(PROJECT_SOURCES))
 COMPILE_ARGS 		+= -DSIM
 COMPILE_ARGS 		+= -DINIT_FILE=\"sim_rom.hex\"